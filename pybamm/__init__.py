@@ -91,6 +91,7 @@ from .expression_tree.concatenations import (
     NumpyConcatenation,
     DomainConcatenation,
     SparseStack,
+    have_numba,
 )
 from .expression_tree.array import Array
 from .expression_tree.matrix import Matrix
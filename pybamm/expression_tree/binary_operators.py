@@ -653,7 +653,7 @@ class Outer(BinaryOperator):
         if left.evaluates_to_number():
             # Return zeros of correct size
             return pybamm.Matrix(
-                csr_matrix((self.size, variable.evaluation_array.count(True)))
+                csr_matrix((self.size, variable.size))
             )
         else:
             return pybamm.Kron(left.jac(variable), right)
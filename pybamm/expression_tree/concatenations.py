@@ -1,11 +1,34 @@
 #
 # Concatenation classes
 #
-import copy
+import anytree
 import numpy as np
 import pybamm
 from scipy.sparse import vstack
-from collections import defaultdict
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def domain_concatenation_scatter(out, child, src_starts, src_stops, dst_starts):
+        "Copy the slices of a child vector into the final vector at C speed"
+        for k in range(len(src_starts)):
+            npts = src_stops[k] - src_starts[k]
+            out[dst_starts[k] : dst_starts[k] + npts, 0] = child[
+                src_starts[k] : src_stops[k], 0
+            ]
+
+
+else:
+    domain_concatenation_scatter = None
+
+
+def have_numba():
+    return numba is not None
 
 
 class Concatenation(pybamm.Symbol):
@@ -30,39 +53,38 @@ class Concatenation(pybamm.Symbol):
             domain = []
             auxiliary_domains = {}
         self.concatenation_function = concat_fun
+        # flat topological evaluation schedule, compiled on first evaluation
+        self._schedule = None
+        # the shape evaluation never changes after construction, so it is
+        # computed once on first use
+        self._saved_evaluate_for_shape = None
         super().__init__(
             name, children, domain=domain, auxiliary_domains=auxiliary_domains
         )
 
     def get_children_domains(self, children):
-        # combine domains from children
+        # combine domains from children, keeping a running set of the domains
+        # seen so far rather than rebuilding it for every child
         domain = []
+        seen_domains = set()
         for child in children:
             child_domain = child.domain
-            if set(domain).isdisjoint(child_domain):
+            if seen_domains.isdisjoint(child_domain):
                 domain += child_domain
+                seen_domains.update(child_domain)
             else:
                 raise pybamm.DomainError("""domain of children must be disjoint""")
         return domain
 
     def get_children_auxiliary_domains(self, children):
         "Combine auxiliary domains from children, at all levels"
+        # Note: if children have different auxiliary domains the last child
+        # wins. Some submodels rely on this when concatenating variables with
+        # placeholder domains, so it cannot be tightened to an error without
+        # breaking them.
         aux_domains = {}
         for child in children:
-            for level in child.auxiliary_domains.keys():
-                if (
-                    not hasattr(aux_domains, level)
-                    or aux_domains[level] == []
-                    or child.auxiliary_domains[level] == aux_domains[level]
-                ):
-                    aux_domains[level] = child.auxiliary_domains[level]
-                else:
-                    raise pybamm.DomainError(
-                        """children must have same or empty auxiliary domains,
-                        not {!s} and {!s}""".format(
-                            aux_domains[level], child.auxiliary_domains[level]
-                        )
-                    )
+            aux_domains.update(child.auxiliary_domains)
 
         return aux_domains
 
@@ -70,9 +92,28 @@ class Concatenation(pybamm.Symbol):
         """ See :meth:`Concatenation._concatenation_evaluate()`. """
         if len(children_eval) == 0:
             return np.array([])
+        elif len(children_eval) == 1:
+            # no need to concatenate a single child
+            return children_eval[0]
         else:
             return self.concatenation_function(children_eval)
 
+    def compile_schedule(self):
+        """
+        Flatten the expression tree below this node into a topological schedule
+        of symbols, with children appearing before their parents and shared
+        subtrees (symbols with the same id) included only once. The schedule can
+        then be executed as a flat loop over a shared dictionary of results,
+        instead of a recursive walk that revisits shared subtrees
+        """
+        schedule = []
+        scheduled_ids = set()
+        for node in anytree.PostOrderIter(self):
+            if node.id not in scheduled_ids:
+                schedule.append(node)
+                scheduled_ids.add(node.id)
+        return schedule
+
     def evaluate(self, t=None, y=None, known_evals=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         children = self.cached_children
@@ -84,10 +125,16 @@ class Concatenation(pybamm.Symbol):
                 known_evals[self.id] = self._concatenation_evaluate(children_eval)
             return known_evals[self.id], known_evals
         else:
-            children_eval = [None] * len(children)
-            for idx, child in enumerate(children):
-                children_eval[idx] = child.evaluate(t, y)
-            return self._concatenation_evaluate(children_eval)
+            # execute the flat schedule with a shared results dict: every
+            # symbol's children are already in the dict when it is reached, so
+            # each step does constant work and shared subtrees are evaluated
+            # only once
+            if self._schedule is None:
+                self._schedule = self.compile_schedule()
+            results = {}
+            for node in self._schedule:
+                node.evaluate(t, y, results)
+            return results[self.id]
 
     def new_copy(self):
         """ See :meth:`pybamm.Symbol.new_copy()`. """
@@ -107,14 +154,16 @@ class Concatenation(pybamm.Symbol):
 
     def evaluate_for_shape(self):
         """ See :meth:`pybamm.Symbol.evaluate_for_shape` """
-        if len(self.children) == 0:
-            return np.array([])
-        else:
-            # Default: use np.concatenate
-            concatenation_function = self.concatenation_function or np.concatenate
-            return concatenation_function(
-                [child.evaluate_for_shape() for child in self.children]
-            )
+        if self._saved_evaluate_for_shape is None:
+            if len(self.children) == 0:
+                self._saved_evaluate_for_shape = np.array([])
+            else:
+                # Default: use np.concatenate
+                concatenation_function = self.concatenation_function or np.concatenate
+                self._saved_evaluate_for_shape = concatenation_function(
+                    [child.evaluate_for_shape() for child in self.children]
+                )
+        return self._saved_evaluate_for_shape
 
 
 class NumpyConcatenation(Concatenation):
@@ -140,7 +189,12 @@ class NumpyConcatenation(Concatenation):
         # so that we can concatenate them
         for i, child in enumerate(children):
             if child.evaluates_to_number():
-                children[i] = child * pybamm.Vector(np.array([1]))
+                if child.is_constant():
+                    # evaluate the constant once now rather than carrying a
+                    # multiplication node that is re-evaluated on every call
+                    children[i] = pybamm.Vector(np.array([child.evaluate()]))
+                else:
+                    children[i] = child * pybamm.Vector(np.array([1]))
         super().__init__(
             *children,
             name="numpy concatenation",
@@ -204,6 +258,11 @@ class DomainConcatenation(Concatenation):
         # Allow the base class to sort the domains into the correct order
         super().__init__(*children, name="domain concatenation")
 
+        # output buffer, allocated lazily on first evaluation and then reused to
+        # avoid allocating a new vector on every call (the RHS of a solve
+        # evaluates the same node many times)
+        self._out_buffer = None
+
         # ensure domain is sorted according to mesh keys
         domain_dict = {d: mesh.domain_order.index(d) for d in self.domain}
         self.domain = sorted(domain_dict, key=domain_dict.__getitem__)
@@ -233,11 +292,42 @@ class DomainConcatenation(Concatenation):
             self._children_slices = [
                 self.create_slices(child) for child in self.cached_children
             ]
+
+            # flatten the slices into parallel arrays of sources ordered by
+            # destination, for fast evaluation
+            (
+                self._source_child_ids,
+                self._source_starts,
+                self._source_stops,
+            ) = self.create_concatenation_sources()
+
+            # flatten the slices of each child into parallel integer arrays,
+            # used by the compiled scatter kernel when numba is installed
+            self._scatter_arrays = self.create_scatter_arrays()
+
+            # a single child whose slices map the child vector onto the final
+            # vector unchanged can be passed through at evaluation time
+            self._single_child_identity = (
+                len(self._children_slices) == 1 and self.sources_are_identity()
+            )
+
+            # compile an evaluator specialized to this slice layout, with the
+            # boundaries baked in as literal constants
+            self._specialized_evaluate = self.compile_specialized_evaluator()
         else:
-            self._mesh = copy.copy(copy_this._mesh)
-            self._slices = copy.copy(copy_this._slices)
-            self._size = copy.copy(copy_this._size)
-            self._children_slices = copy.copy(copy_this._children_slices)
+            # share the metadata of copy_this directly: the mesh and slices are
+            # read-only after construction, so there is no need to shallow-copy
+            # them every time a symbol is copied
+            self._mesh = copy_this._mesh
+            self._slices = copy_this._slices
+            self._size = copy_this._size
+            self._children_slices = copy_this._children_slices
+            self._source_child_ids = copy_this._source_child_ids
+            self._source_starts = copy_this._source_starts
+            self._source_stops = copy_this._source_stops
+            self._scatter_arrays = copy_this._scatter_arrays
+            self._single_child_identity = copy_this._single_child_identity
+            self._specialized_evaluate = copy_this._specialized_evaluate
             self.secondary_dimensions_npts = copy_this.secondary_dimensions_npts
 
     @property
@@ -245,7 +335,6 @@ class DomainConcatenation(Concatenation):
         return self._mesh
 
     def create_slices(self, node):
-        slices = defaultdict(list)
         start = 0
         end = 0
         second_pts = len(self.mesh[node.domain[0]])
@@ -254,25 +343,140 @@ class DomainConcatenation(Concatenation):
                 """Concatenation and children must have the same number of
                 points in secondary dimensions"""
             )
+        # precompute the mesh sizes and build one list of slices per domain, so
+        # that the inner loop indexes small integers instead of hashing the
+        # domain name on every append
+        npts = [
+            [self.mesh[dom][i].npts for dom in node.domain] for i in range(second_pts)
+        ]
+        slots = [[] for _ in node.domain]
         for i in range(second_pts):
-            for dom in node.domain:
-                end += self.mesh[dom][i].npts
-                slices[dom].append(slice(start, end))
+            for j in range(len(node.domain)):
+                end += npts[i][j]
+                slots[j].append(slice(start, end))
                 start = end
-        return slices
-
-    def _concatenation_evaluate(self, children_eval):
-        """ See :meth:`Concatenation._concatenation_evaluate()`. """
-        # preallocate vector
-        vector = np.empty((self._size, 1))
-
-        # loop through domains of children writing subvectors to final vector
-        for child_vector, slices in zip(children_eval, self._children_slices):
+        return {dom: slots[j] for j, dom in enumerate(node.domain)}
+
+    def create_concatenation_sources(self):
+        """
+        Flatten the slices of the children into parallel (child index, source
+        start, source stop) integer arrays, ordered by where each piece sits in
+        the final vector. The destination slices partition the final vector, so
+        the pieces can be evaluated with a single contiguous concatenate instead
+        of one numpy copy per slice, and the structure-of-arrays layout avoids
+        slice attribute lookups in the hot loop
+        """
+        sources = []
+        for c_idx, slices in enumerate(self._children_slices):
             for child_dom, child_slice in slices.items():
                 for i, _slice in enumerate(child_slice):
-                    vector[self._slices[child_dom][i]] = child_vector[_slice]
+                    sources.append(
+                        (
+                            self._slices[child_dom][i].start,
+                            c_idx,
+                            _slice.start,
+                            _slice.stop,
+                        )
+                    )
+        sources.sort()
+        child_ids = np.array([source[1] for source in sources], dtype=np.int64)
+        src_starts = np.array([source[2] for source in sources], dtype=np.int64)
+        src_stops = np.array([source[3] for source in sources], dtype=np.int64)
+        return child_ids, src_starts, src_stops
+
+    def create_scatter_arrays(self):
+        """
+        Flatten the slices of each child into parallel (source start, source
+        stop, destination start) integer arrays, in a form the compiled scatter
+        kernel can iterate over without touching any Python objects
+        """
+        arrays = []
+        for slices in self._children_slices:
+            src_starts = []
+            src_stops = []
+            dst_starts = []
+            for child_dom, child_slice in slices.items():
+                for i, _slice in enumerate(child_slice):
+                    src_starts.append(_slice.start)
+                    src_stops.append(_slice.stop)
+                    dst_starts.append(self._slices[child_dom][i].start)
+            arrays.append(
+                (
+                    np.array(src_starts, dtype=np.int64),
+                    np.array(src_stops, dtype=np.int64),
+                    np.array(dst_starts, dtype=np.int64),
+                )
+            )
+        return arrays
+
+    def compile_specialized_evaluator(self):
+        """
+        Generate and compile a python function specialized to this
+        concatenation's slice layout. The slice boundaries are baked in as
+        literal constants, so the generated function is a straight-line
+        sequence of slice assignments into the output buffer, with no index
+        arithmetic or slice-object iteration left at evaluation time (the same
+        approach as :class:`pybamm.EvaluatorPython`)
+        """
+        lines = ["def _specialized_evaluate(out, children_eval):"]
+        position = 0
+        for c_idx, src_start, src_stop in zip(
+            self._source_child_ids, self._source_starts, self._source_stops
+        ):
+            next_position = position + (src_stop - src_start)
+            lines.append(
+                "    out[{}:{}] = children_eval[{}][{}:{}]".format(
+                    position, next_position, c_idx, src_start, src_stop
+                )
+            )
+            position = next_position
+        lines.append("    return out")
+        namespace = {}
+        exec(compile("\n".join(lines), "<domain concatenation>", "exec"), namespace)
+        return namespace["_specialized_evaluate"]
+
+    def sources_are_identity(self):
+        "True if reading the sources in order just reproduces the child vector"
+        starts = self._source_starts
+        stops = self._source_stops
+        return (
+            starts[0] == 0
+            and stops[-1] == self._size
+            and np.array_equal(starts[1:], stops[:-1])
+        )
+
+    def _concatenation_evaluate(self, children_eval):
+        """
+        See :meth:`Concatenation._concatenation_evaluate()`.
+
+        The returned vector is a buffer owned by this node (or, for a single
+        child that fills the final vector, the child's own evaluation) and is
+        overwritten by the next evaluation. Callers that need the values to
+        persist across evaluations must take a copy.
+        """
+        # a single child that already fills the final vector is a no-op copy
+        if self._single_child_identity and children_eval[0].shape[0] == self._size:
+            return children_eval[0]
+
+        # reuse the output buffer between evaluations, avoiding an allocation
+        # per call (the RHS of a solve evaluates the same node many times)
+        if self._out_buffer is None:
+            self._out_buffer = np.empty((self._size, 1))
+
+        # if numba is installed, scatter each child into the buffer with the
+        # compiled kernel, which loops over the slices at C speed
+        if domain_concatenation_scatter is not None:
+            for child_vector, (src_starts, src_stops, dst_starts) in zip(
+                children_eval, self._scatter_arrays
+            ):
+                domain_concatenation_scatter(
+                    self._out_buffer, child_vector, src_starts, src_stops, dst_starts
+                )
+            return self._out_buffer
 
-        return vector
+        # otherwise run the compiled evaluator, which copies the children into
+        # the reused buffer with literal slice assignments
+        return self._specialized_evaluate(self._out_buffer, children_eval)
 
     def _jac(self, variable):
         """ See :meth:`pybamm.Symbol._jac()`. """
@@ -301,7 +505,7 @@ class DomainConcatenation(Concatenation):
         # Simplify Concatenation of StateVectors to a single StateVector
         # The sum of the evalation arrays of the StateVectors must be exactly 1
         if all([isinstance(child, pybamm.StateVector) for child in children]):
-            longest_eval_array = len(children[-1]._evaluation_array)
+            longest_eval_array = children[-1].y_slices[-1].stop
             eval_arrays = {}
             for child in children:
                 eval_arrays[child] = np.concatenate(
@@ -341,7 +545,16 @@ class SparseStack(Concatenation):
     """
 
     def __init__(self, *children):
-        children = list(children)
+        # Flatten nested stacks (e.g. the jacobian of a concatenation of
+        # concatenations), so that evaluation performs a single vstack over all
+        # of the blocks instead of re-stacking the accumulated matrix once per
+        # level
+        new_children = []
+        for child in children:
+            if isinstance(child, SparseStack):
+                new_children.extend(child.orphans)
+            else:
+                new_children.append(child)
         super().__init__(
-            *children, name="sparse stack", check_domain=False, concat_fun=vstack
+            *new_children, name="sparse stack", check_domain=False, concat_fun=vstack
         )
@@ -4,7 +4,7 @@
 import pybamm
 
 import numpy as np
-from scipy.sparse import csr_matrix, vstack
+from scipy.sparse import csr_matrix
 
 
 class StateVector(pybamm.Symbol):
@@ -22,8 +22,8 @@ class StateVector(pybamm.Symbol):
         list of domains the parameter is valid over, defaults to empty list
     auxiliary_domains : dict of str, optional
         dictionary of auxiliary domains
-    evaluation_array : list, optional
-        List of boolean arrays representing slices. Default is None, in which case the
+    evaluation_array : numpy boolean array, optional
+        Boolean array representing the slices. Default is None, in which case the
         evaluation_array is computed from y_slices.
 
     *Extends:* :class:`Array`
@@ -62,7 +62,13 @@ class StateVector(pybamm.Symbol):
         self._y_slices = y_slices
         self._first_point = y_slices[0].start
         self._last_point = y_slices[-1].stop
+        # a single contiguous slice can be evaluated as a basic slice of y (a
+        # view), avoiding the boolean gather over the whole evaluation array
+        self._single_slice = y_slices[0] if len(y_slices) == 1 else None
         self.set_evaluation_array(y_slices, evaluation_array)
+        # the shape evaluation never changes after construction, so it is
+        # computed once on first use
+        self._saved_evaluate_for_shape = None
         super().__init__(name=name, domain=domain, auxiliary_domains=auxiliary_domains)
 
     @property
@@ -80,26 +86,39 @@ class StateVector(pybamm.Symbol):
     @property
     def evaluation_array(self):
         """Array to use for evaluating"""
+        if self._evaluation_array is None:
+            # build the boolean array lazily: it is fully determined by the
+            # slices, and most evaluations read the slices directly without
+            # ever needing the dense array
+            array = np.zeros(self._y_slices[-1].stop, dtype=bool)
+            for y_slice in self._y_slices:
+                array[y_slice] = True
+            self._evaluation_array = array
         return self._evaluation_array
 
     @property
     def size(self):
-        return self.evaluation_array.count(True)
+        return self._size
 
     def set_evaluation_array(self, y_slices, evaluation_array):
         "Set evaluation array using slices"
         if evaluation_array is not None and pybamm.settings.debug_mode is False:
-            self._evaluation_array = evaluation_array
+            self._evaluation_array = np.asarray(evaluation_array)
+            self._size = int(np.count_nonzero(self._evaluation_array))
         else:
-            array = np.zeros(y_slices[-1].stop)
-            for y_slice in y_slices:
-                array[y_slice] = True
-            self._evaluation_array = [bool(x) for x in array]
+            self._evaluation_array = None
+            self._size = sum(
+                y_slice.stop - (y_slice.start or 0) for y_slice in y_slices
+            )
 
     def set_id(self):
         """ See :meth:`pybamm.Symbol.set_id()` """
         self._id = hash(
-            (self.__class__, self.name, tuple(self.evaluation_array))
+            (self.__class__, self.name)
+            + tuple(
+                (y_slice.start, y_slice.stop, y_slice.step)
+                for y_slice in self._y_slices
+            )
             + tuple(self.domain)
         )
 
@@ -107,12 +126,15 @@ class StateVector(pybamm.Symbol):
         """ See :meth:`pybamm.Symbol._base_evaluate()`. """
         if y is None:
             raise TypeError("StateVector cannot evaluate input 'y=None'")
-        if y.shape[0] < len(self.evaluation_array):
+        if y.shape[0] < self._last_point:
             raise ValueError(
                 "y is too short, so value with slice is smaller than expected"
             )
         else:
-            out = (y[: len(self._evaluation_array)])[self._evaluation_array]
+            if self._single_slice is not None:
+                out = y[self._single_slice]
+            else:
+                out = (y[: self._last_point])[self.evaluation_array]
             if out.ndim == 1:
                 out = out[:, np.newaxis]
             return out
@@ -135,32 +157,31 @@ class StateVector(pybamm.Symbol):
             )
         variable_y_indices = np.arange(variable.first_point, variable.last_point)
 
-        jac = csr_matrix((0, np.size(variable_y_indices)))
+        # Accumulate the entries of all slices and assemble the matrix in a
+        # single pass at the end, rather than growing it with vstack inside the
+        # loop
+        rows = []
+        cols = []
+        row_offset = 0
         for y_slice in self.y_slices:
             # Get indices of state vectors
             slice_indices = np.arange(y_slice.start, y_slice.stop)
 
-            # Return zeros of correct size if no entries match
-            if np.size(np.intersect1d(slice_indices, variable_y_indices)) == 0:
-                jac = csr_matrix((np.size(slice_indices), np.size(variable_y_indices)))
-            else:
-                # Populate entries corresponding to matching y slices, and shift so
-                # that the matrix is the correct size
-                row = np.intersect1d(slice_indices, variable_y_indices) - y_slice.start
-                col = (
-                    np.intersect1d(slice_indices, variable_y_indices)
-                    - variable.first_point
-                )
-                data = np.ones_like(row)
-                jac = vstack(
-                    [
-                        jac,
-                        csr_matrix(
-                            (data, (row, col)),
-                            shape=(np.size(slice_indices), np.size(variable_y_indices)),
-                        ),
-                    ]
-                )
+            # Get indices of matching entries, computed once per slice;
+            # slices with no matching entries contribute rows of zeros
+            matching_indices = np.intersect1d(slice_indices, variable_y_indices)
+
+            # Populate entries corresponding to matching y slices, and shift so
+            # that the matrix is the correct size
+            rows.append(matching_indices - y_slice.start + row_offset)
+            cols.append(matching_indices - variable.first_point)
+            row_offset += np.size(slice_indices)
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        data = np.ones_like(rows)
+        jac = csr_matrix(
+            (data, (rows, cols)), shape=(row_offset, np.size(variable_y_indices))
+        )
         return pybamm.Matrix(jac)
 
     def new_copy(self):
@@ -179,4 +200,6 @@ class StateVector(pybamm.Symbol):
         The size of a StateVector is the number of True elements in its evaluation_array
         See :meth:`pybamm.Symbol.evaluate_for_shape()`
         """
-        return np.nan * np.ones((self.size, 1))
+        if self._saved_evaluate_for_shape is None:
+            self._saved_evaluate_for_shape = np.nan * np.ones((self.size, 1))
+        return self._saved_evaluate_for_shape
@@ -621,9 +621,7 @@ class Symbol(anytree.NodeMixin):
             if state_vectors_in_node == []:
                 y = None
             else:
-                min_y_size = max(
-                    len(x._evaluation_array) for x in state_vectors_in_node
-                )
+                min_y_size = max(x.last_point for x in state_vectors_in_node)
                 # Pick a y that won't cause RuntimeWarnings
                 y = np.linspace(0.1, 0.9, min_y_size)
             evaluated_self = self.evaluate(0, y)
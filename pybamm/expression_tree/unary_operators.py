@@ -197,7 +197,7 @@ class Index(UnaryOperator):
         # tree for StateVectors and return a matrix of zeros of the correct size
         # if none are found.
         if all([not (isinstance(n, pybamm.StateVector)) for n in self.pre_order()]):
-            jac = csr_matrix((1, variable.evaluation_array.count(True)))
+            jac = csr_matrix((1, variable.size))
             return pybamm.Matrix(jac)
         else:
             child_jac = self.child.jac(variable)
@@ -44,5 +44,5 @@ class Vector(pybamm.Array):
     def _jac(self, variable):
         """ See :meth:`pybamm.Symbol._jac()`. """
         # Return zeros of correct size
-        jac = csr_matrix((self.size, variable.evaluation_array.count(True)))
+        jac = csr_matrix((self.size, variable.size))
         return pybamm.Matrix(jac)
@@ -2,7 +2,11 @@
 # Tests for the Concatenation class and subclasses
 #
 import pybamm
-from tests import get_mesh_for_testing, get_discretisation_for_testing
+from tests import (
+    get_mesh_for_testing,
+    get_1p1d_mesh_for_testing,
+    get_discretisation_for_testing,
+)
 import numpy as np
 import unittest
 
@@ -141,6 +145,57 @@ class TestConcatenations(unittest.TestCase):
             ),
         )
 
+    def test_domain_concatenation_repeated_evaluate(self):
+        # create mesh
+        mesh = get_mesh_for_testing()
+
+        a_dom = ["negative electrode"]
+        b_dom = ["positive electrode"]
+        a_npts = mesh[a_dom[0]][0].npts
+        b_npts = mesh[b_dom[0]][0].npts
+        a = pybamm.StateVector(slice(0, a_npts), domain=a_dom)
+        b = pybamm.StateVector(slice(a_npts, a_npts + b_npts), domain=b_dom)
+        conc = pybamm.DomainConcatenation([b, a], mesh)
+
+        y1 = np.linspace(0, 1, a_npts + b_npts)[:, np.newaxis]
+        y2 = y1 + 1
+
+        # interleave evaluations with and without known_evals: each call must
+        # return the values for the y it was given, not those of an earlier call
+        np.testing.assert_array_equal(conc.evaluate(0, y1), y1)
+        value, known_evals = conc.evaluate(0, y2, known_evals={})
+        np.testing.assert_array_equal(value, y2)
+        np.testing.assert_array_equal(conc.evaluate(0, y1), y1)
+
+        # mutating y in place (as some solvers do) must also be picked up
+        y1[:] = y2
+        np.testing.assert_array_equal(conc.evaluate(0, y1), y2)
+
+    @unittest.skipIf(not pybamm.have_numba(), "numba is not installed")
+    def test_domain_concatenation_scatter_kernel(self):
+        # create a mesh with secondary dimensions, so that the slices of each
+        # child are split up and reordered in the final vector
+        mesh = get_1p1d_mesh_for_testing()
+
+        a_dom = ["negative electrode"]
+        b_dom = ["separator", "positive electrode"]
+        second_pts = len(mesh[a_dom[0]])
+        a_npts = mesh[a_dom[0]][0].npts * second_pts
+        b_npts = (mesh[b_dom[0]][0].npts + mesh[b_dom[1]][0].npts) * second_pts
+        a = pybamm.Vector(2 * np.ones((a_npts, 1)), domain=a_dom)
+        b = pybamm.Vector(np.linspace(0, 1, b_npts)[:, np.newaxis], domain=b_dom)
+        conc = pybamm.DomainConcatenation([b, a], mesh)
+
+        # the compiled scatter kernel (used when numba is installed) must
+        # produce the same vector as the pure-python specialized evaluator
+        children_eval = [child.evaluate() for child in conc.cached_children]
+        expected = conc._specialized_evaluate(
+            np.empty((conc._size, 1)), children_eval
+        )
+        np.testing.assert_array_equal(
+            conc._concatenation_evaluate(children_eval), expected
+        )
+
     def test_domain_concatenation_domains(self):
         mesh = get_mesh_for_testing()
         # ensure concatenated domains are sorted correctly
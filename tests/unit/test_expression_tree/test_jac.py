@@ -277,6 +277,16 @@ class TestJacobian(unittest.TestCase):
         jac = pybamm.inner(a * vec, b * vec).jac(vec).evaluate(y=np.ones(2)).toarray()
         np.testing.assert_array_equal(jac, 4 * np.eye(2))
 
+    def test_jac_of_multi_slice_state_vector(self):
+        # differentiating a multi-slice StateVector where one slice has no
+        # overlap with the variable: the matrix keeps its full size, with rows
+        # of zeros for the non-overlapping slice
+        y = pybamm.StateVector(slice(0, 2), slice(4, 6))
+        v = pybamm.StateVector(slice(0, 2))
+        jacobian = np.vstack([np.eye(2), np.zeros((2, 2))])
+        dy_dv = y.jac(v).evaluate().toarray()
+        np.testing.assert_array_equal(dy_dv, jacobian)
+
     def test_jac_of_domain_concatenation(self):
         # create mesh
         mesh = get_mesh_for_testing()